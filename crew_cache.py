@@ -0,0 +1,129 @@
+from crewai.crews.crew_output import CrewOutput
+from logging_util import get_request_logger
+from typing import cast, TypeVar, Callable, Any
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import tempfile
+import functools
+import hashlib
+import json
+import time
+import os
+
+# Type variable for generic function type
+F = TypeVar('F', bound=Callable[..., Any])
+
+logger = get_request_logger()
+
+CACHE_DIR = Path(os.getenv("CREW_CACHE_DIR", ".crew_cache"))
+# Seconds a crew result is served from disk, and the most results kept there
+CACHE_TTL = float(os.getenv("CREW_CACHE_TTL", 86400))
+CACHE_MAX_ENTRIES = int(os.getenv("CREW_CACHE_MAX_ENTRIES", 1000))
+
+# Pydantic outputs can't be rebuilt from JSON without their model, the mermaid crews have none
+_DUMP_EXCLUDE = {"pydantic": True, "tasks_output": {"__all__": {"pydantic"}}}
+
+def cache_key(crew, inputs: dict) -> str:
+    """
+    Hash the kickoff inputs together with the model and the crew's task templates,
+    so editing a task description or switching models invalidates old entries.
+    """
+    payload = {
+        "inputs": inputs,
+        "model": os.getenv("MODEL"),
+        "tasks": [(task.description, task.expected_output) for task in crew.tasks],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def _prune(cache_dir: Path, max_entries: int):
+    """Delete the oldest entries beyond max_entries"""
+    entries = []
+    for path in cache_dir.glob("*.json"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            # Pruned by a concurrent writer
+            pass
+    entries.sort(reverse=True)
+    for _, path in entries[max_entries:]:
+        path.unlink(missing_ok=True)
+
+# Decorator to cache crew results on disk
+def llm_cached(key_fn: Callable[..., str] = cache_key, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+    """
+    Decorator for functions taking (crew, inputs) that stores the CrewOutput on disk as JSON.
+    Repeated kickoffs with the same inputs return the stored result with no LLM calls,
+    for `ttl` seconds after it was written. At most `max_entries` results are kept.
+    Set CREW_CACHE_DISABLED=1 to always run the crew.
+    Only use it for crews without side effects - a cache hit skips every tool call.
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(crew, inputs: dict):
+            if os.getenv("CREW_CACHE_DISABLED") == "1":
+                return func(crew, inputs)
+
+            path = CACHE_DIR / f"{key_fn(crew, inputs)}.json"
+            try:
+                if time.time() - path.stat().st_mtime < ttl:
+                    return CrewOutput.model_validate_json(path.read_bytes())
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                # Unreadable entry (e.g. written by an older crewai), run the crew again
+                logger.warning("Ignoring unreadable crew cache entry %s: %s", path, e)
+
+            result = func(crew, inputs)
+
+            # Write to a temp file first so concurrent readers never see a partial entry
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=CACHE_DIR, suffix=".tmp", delete=False) as file:
+                file.write(result.model_dump_json(exclude=_DUMP_EXCLUDE).encode("utf-8"))
+            os.replace(file.name, path)
+            _prune(CACHE_DIR, max_entries)
+            return result
+
+        return cast(F, wrapper)
+    return decorator
+
+@llm_cached()
+def cached_kickoff(crew, inputs: dict):
+    """crew.kickoff(inputs=inputs), answered from the disk cache when possible"""
+    return crew.kickoff(inputs=inputs)
+
+# Decorator to keep recent results in memory
+def memoized(key_fn: Callable[..., Any], maxsize: int = 256, ttl: float = 3600):
+    """
+    Decorator that keeps the last `maxsize` results in memory for `ttl` seconds, keyed by key_fn(*args, **kwargs).
+    A hit skips building the crew and reading the disk cache entirely.
+    Set CREW_CACHE_DISABLED=1 to always call the function.
+    """
+    def decorator(func: F) -> F:
+        entries = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if os.getenv("CREW_CACHE_DISABLED") == "1":
+                return func(*args, **kwargs)
+
+            key = key_fn(*args, **kwargs)
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and time.monotonic() - entry[0] < ttl:
+                    entries.move_to_end(key)
+                    return entry[1]
+
+            result = func(*args, **kwargs)
+
+            with lock:
+                entries[key] = (time.monotonic(), result)
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = entries.clear
+        return cast(F, wrapper)
+    return decorator
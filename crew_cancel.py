@@ -0,0 +1,62 @@
+from crewai.tools import BaseTool
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import Any
+import threading
+
+class CrewCancelled(Exception):
+    """Raised to stop a crew whose caller has gone, ie a closed event stream"""
+
+# Set while a cancellable run (ie a streamed request) builds its crews, see cancel_scope
+_CANCEL_EVENT: ContextVar[threading.Event | None] = ContextVar("cancel_event", default=None)
+
+@contextmanager
+def cancel_scope(cancelled: threading.Event):
+    """Crews built under this block (or in a context copied from it) stop once `cancelled` is set"""
+    token = _CANCEL_EVENT.set(cancelled)
+    try:
+        yield
+    finally:
+        _CANCEL_EVENT.reset(token)
+
+def check_cancelled():
+    """Raise CrewCancelled when the current run has been cancelled"""
+    cancelled = _CANCEL_EVENT.get()
+    if cancelled is not None and cancelled.is_set():
+        raise CrewCancelled("Run cancelled by the client")
+
+class _CancellableTool(BaseTool):
+    """Runs `tool` unless the run it was built for has been cancelled"""
+    tool: BaseTool
+    cancelled: Any
+
+    def _run(self, **kwargs) -> Any:
+        # Checked before the call, so a cancelled run never reaches ie write_neo4j_cypher
+        if self.cancelled.is_set():
+            raise CrewCancelled(f"Run cancelled by the client before {self.name}")
+        return self.tool.run(**kwargs)
+
+def cancellable_agent_settings(tools: list) -> dict:
+    """
+    Agent keyword arguments for `tools`. Inside a cancel_scope every tool checks the
+    cancel flag before it runs, and the agent doesn't retry its task, since CrewAI
+    retries a task that raised (CrewCancelled included) up to max_retry_limit times.
+    """
+    cancelled = _CANCEL_EVENT.get()
+    if cancelled is None:
+        return {"tools": tools}
+
+    guarded = []
+    for tool in tools:
+        wrapper = _CancellableTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            result_as_answer=tool.result_as_answer,
+            tool=tool,
+            cancelled=cancelled,
+        )
+        # BaseTool formats the description on init, keep the wrapped tool's as is
+        wrapper.description = tool.description
+        guarded.append(wrapper)
+    return {"tools": guarded, "max_retry_limit": 0}
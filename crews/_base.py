@@ -0,0 +1,107 @@
+from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task
+from crews.prompt_caching_llm import create_agent_llm
+from crew_cancel import cancellable_agent_settings
+from schema_cache import stash_schema_step
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import functools
+import copy
+import yaml
+
+@functools.lru_cache(maxsize=None)
+def _parse_yaml(config_path: str):
+    with open(config_path, "r", encoding="utf-8") as file:
+        return yaml.safe_load(file)
+
+def load_yaml(config_path) -> dict:
+    """
+    Return a yaml config that is parsed from disk only once per process.
+    CrewBase replaces names in the loaded dict with agents and tasks, so every crew gets its own copy.
+    """
+    return copy.deepcopy(_parse_yaml(str(config_path)))
+
+class BaseMermaidCrew():
+    """Mermaid graph crew run by a single MCP tool using agent"""
+
+    agents_config = "./agents.yaml"
+    tasks_config = "./tasks.yaml"
+
+    def __init__(self, tools: Optional[List[Any]] = None, step_listener: Optional[Callable[[Any], None]] = None):
+        """Initialize the crew with external tools, step_listener is called for every agent step"""
+        self._tools = tools or []
+        self._step_listener = step_listener
+        super().__init__()
+
+    @property
+    def tools(self) -> List[Any]:
+        """Return the tools assigned during initialization"""
+        return self._tools
+
+    @tools.setter
+    def tools(self, tools: List[Any]):
+        """Set tools after initialization if needed"""
+        self._tools = tools
+
+    @crew
+    def crew(self) -> Crew:
+        return Crew(
+            agents=self.agents,  # Automatically collected by the @agent decorator
+            tasks=self.tasks,    # Automatically collected by the @task decorator.
+            process=Process.sequential,
+            verbose=True,
+        )
+
+def _mcp_agent(self) -> Agent:
+    step_listener = self._step_listener
+
+    def step_callback(output):
+        # Large schema results are swapped for a schema_ref before later tasks see them
+        stash_schema_step(output)
+        if step_listener is not None:
+            step_listener(output)
+
+    return Agent(
+        config=self.agents_config['mcp_agent'], # type: ignore[index]
+        verbose=True,
+        llm=create_agent_llm(),
+        step_callback=step_callback,
+        **cancellable_agent_settings(self.tools),
+    )
+
+def _config_task(task_keys: Union[str, Tuple[str, ...]], method_name: str):
+    if isinstance(task_keys, str):
+        task_keys = (task_keys,)
+
+    def task_method(self) -> Task:
+        config = self.tasks_config[task_keys[0]] # type: ignore[index]
+        if len(task_keys) > 1:
+            # Extra keys only contribute description fragments, appended in order
+            config = {
+                **config,
+                "description": "\n".join(self.tasks_config[key]["description"] for key in task_keys), # type: ignore[index]
+            }
+        return Task(
+            config=config,
+        )
+    task_method.__name__ = task_method.__qualname__ = method_name
+    return task(task_method)
+
+def make_mermaid_crew(name: str, tasks: Dict[str, Union[str, Tuple[str, ...]]]):
+    """
+    Build a CrewBase crew class on top of BaseMermaidCrew.
+    `tasks` maps each task method name to its key in tasks.yaml, in execution order.
+    A tuple of keys builds the task from the first key with the descriptions of all keys joined.
+    """
+    # CrewBase only collects @agent/@task methods defined on the decorated class itself,
+    # so they are added to the new class rather than inherited
+    namespace = {
+        "__module__": __name__,
+        "__doc__": BaseMermaidCrew.__doc__,
+        "mcp_agent": agent(_mcp_agent),
+    }
+    for method_name, task_key in tasks.items():
+        namespace[method_name] = _config_task(task_key, method_name)
+
+    crew_class = CrewBase(type(name, (BaseMermaidCrew,), namespace))
+    crew_class.load_yaml = staticmethod(load_yaml)
+    return crew_class
@@ -0,0 +1,62 @@
+from crewai import LLM
+from crewai.utilities.llm_utils import create_llm
+from typing import Any, Dict, List
+import functools
+import inspect
+
+class PromptCachingLLM(LLM):
+    """
+    LLM that marks the invariant head of every request with Anthropic's
+    `cache_control` hint, so the system prompt (role, tool schemas, format rules)
+    and the task prompt are billed as cache reads on every agent iteration.
+
+    Task descriptions put their static instructions before the per-kickoff inputs,
+    which also lets OpenAI's automatic prefix caching apply without any markers.
+    """
+
+    def _format_messages_for_provider(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        messages = super()._format_messages_for_provider(messages)
+        if not self.is_anthropic:
+            return messages
+
+        formatted = []
+        marked_user = False
+        for message in messages:
+            # Mark the system prompt and the first real user message (the task prompt),
+            # skipping the "." placeholder CrewAI inserts ahead of system messages
+            is_task_prompt = message["role"] == "user" and not marked_user and message["content"] != "."
+            if (message["role"] == "system" or is_task_prompt) and isinstance(message["content"], str):
+                marked_user = marked_user or is_task_prompt
+                message = {
+                    **message,
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": message["content"],
+                            "cache_control": {"type": "ephemeral"},
+                        }
+                    ],
+                }
+            formatted.append(message)
+        return formatted
+
+@functools.lru_cache(maxsize=1)
+def create_agent_llm() -> LLM:
+    """
+    Build the LLM configured by the environment (MODEL, API keys, ...) the same way
+    CrewAI does by default, switching to PromptCachingLLM for Anthropic models.
+    Built once per process and shared by every agent, it only holds configuration.
+    """
+    llm = create_llm()
+    if getattr(llm, "is_anthropic", False) and not isinstance(llm, PromptCachingLLM):
+        return PromptCachingLLM(**_llm_settings(llm))
+    return llm
+
+def _llm_settings(llm: LLM) -> Dict[str, Any]:
+    """Every constructor argument of an LLM (max_tokens, timeout, ...) as currently set on it, plus its extra params"""
+    names = [
+        name for name, param in inspect.signature(LLM.__init__).parameters.items()
+        if name != "self" and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)
+    ]
+    settings = {name: getattr(llm, name) for name in names if hasattr(llm, name)}
+    return {**(getattr(llm, "additional_params", None) or {}), **settings}
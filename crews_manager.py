@@ -1,330 +1,818 @@
 from crewai import Agent, Task, Crew, Process
-from crewai_tools import MCPServerAdapter
-from crews.crew_create_mermaid import CreateMermaidCrew
+from crewai.tools import tool
+from mcpadapt.core import MCPAdapt
+from mcpadapt.crewai_adapter import CrewAIAdapter
+from crews.crew_create_mermaid import CreateMermaidCrew, CreateMermaidMinimalCrew
 from crews.crew_edit_mermaid import EditMermaidCrew
+from crews.prompt_caching_llm import create_agent_llm
+from crew_cache import cached_kickoff, memoized
+from crew_cancel import CrewCancelled, cancellable_agent_settings
+from schema_cache import stash_schema_step, fetch_schema
+from cypher_utils import unwind_guardrail, index_queries, CypherPlan
+from mermaid_parser import connect_mermaid, connected_mermaid_guardrail
+from logging_util import get_request_logger, get_request_id, bind_request_id
 from mcp import StdioServerParameters
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, RoutingControl
+from neo4j.exceptions import Neo4jError, DriverError
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import contextlib
+import threading
+import string
+import types
+import functools
+import json
+import logging
+import asyncio
 import warnings
+import time
+import atexit
 import os
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
+logger = get_request_logger()
+
+# Only the variables the MCP servers and uvx need, snapshotted once at import.
+# The mcp stdio client adds its own safe defaults (HOME, PATH, USER, ...) on top
+_MCP_SERVER_ENV_VARS = ("NEO4J_URI", "NEO4J_USERNAME", "NEO4J_PASSWORD", "NEO4J_DATABASE", "PATH", "HOME")
+_mcp_server_env = {key: os.environ[key] for key in _MCP_SERVER_ENV_VARS if key in os.environ}
+
 server_params=[
     StdioServerParameters(
         command="uvx", 
         args=["mcp-neo4j-data-modeling@0.1.1", "--transport", "stdio" ],
-        env=os.environ,
+        env=_mcp_server_env,
     ),
     StdioServerParameters(
         command="uvx",
         args=["mcp-neo4j-cypher"],
-        env=os.environ,
+        env=_mcp_server_env,
     ),
 ]
 
+# Tools the entry points use, a server upgrade that drops one fails at listing time instead of mid-kickoff
+REQUIRED_TOOLS = (
+    "validate_data_model",
+    "get_mermaid_config_str",
+    "get_node_cypher_ingest_query",
+    "get_relationship_cypher_ingest_query",
+    "get_neo4j_schema",
+    "write_neo4j_cypher",
+)
+
+# Crews kicked off at once by a parallel phase, each one keeps several agents and LLM calls busy
+MAX_PARALLEL_CREWS = int(os.getenv("MAX_PARALLEL_CREWS", 3))
+
+# Threads running crews for async callers, sized to what the LLM backend sustains rather than
+# the default executor's cpu_count + 4. Further crews queue for a free thread
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", 4))
+CREW_EXECUTOR = ThreadPoolExecutor(max_workers=CREW_WORKERS, thread_name_prefix="crew")
+atexit.register(CREW_EXECUTOR.shutdown, wait=False)
+
+# Crews submitted to CREW_EXECUTOR at once, one per thread unless raised to let a few queue inside it.
+# Further crews wait here for a slot, which is only freed once the crew's thread is done
+MAX_INFLIGHT = int(os.getenv("MCP_MAX_INFLIGHT", CREW_WORKERS))
+_crew_slots = asyncio.Semaphore(MAX_INFLIGHT)
+_crew_stats = {"submitted": 0, "waiting": 0}
+
+def crew_stats() -> dict:
+    """
+    Crews running on a CREW_EXECUTOR thread, submitted but queued inside the executor
+    (only when MAX_INFLIGHT > CREW_WORKERS) and waiting for an in-flight slot
+    """
+    running = min(_crew_stats["submitted"], CREW_WORKERS)
+    return {
+        "max_inflight": MAX_INFLIGHT,
+        "workers": CREW_WORKERS,
+        "running": running,
+        "queued": _crew_stats["submitted"] - running,
+        "waiting": _crew_stats["waiting"],
+    }
+
+def _release_crew_slot():
+    _crew_stats["submitted"] -= 1
+    _crew_slots.release()
+
+async def run_crew_in_executor(func, *args, **kwargs):
+    """
+    Like asyncio.to_thread, but on CREW_EXECUTOR and once one of the MAX_INFLIGHT slots is free.
+    The caller's contextvars (ie the request id) are carried over.
+    Cancelling the caller doesn't free the slot of a crew that already started, its
+    thread keeps running (see CrewCancelled), so the slot is released when the thread is done.
+    """
+    _crew_stats["waiting"] += 1
+    try:
+        await _crew_slots.acquire()
+    finally:
+        _crew_stats["waiting"] -= 1
+    _crew_stats["submitted"] += 1
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    try:
+        future = CREW_EXECUTOR.submit(context.run, func, *args, **kwargs)
+    except RuntimeError:
+        # Executor already shut down
+        _release_crew_slot()
+        raise
+    # Also called right away when a queued crew is cancelled before it starts
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release_crew_slot))
+    return await asyncio.wrap_future(future)
+
+# Shared MCP servers
+def _start_mcp_server(params: StdioServerParameters) -> MCPAdapt:
+    """Start one MCP server and open its stdio session, the same way MCPServerAdapter does"""
+    mcp_adapt = MCPAdapt(params, CrewAIAdapter())
+    try:
+        mcp_adapt.start()
+    except Exception:
+        # Best effort, a server that failed to start may have nothing to close
+        with contextlib.suppress(Exception):
+            mcp_adapt.close()
+        raise
+    return mcp_adapt
+
+class CachedToolset:
+    """
+    Keeps one MCPAdapt session per MCP server running for the life of the process
+    and caches their tool listing for `ttl` seconds, so entry points skip the
+    subprocess spawn and ListTools round trip on every call.
+    """
+
+    def __init__(self, server_params: list[StdioServerParameters], ttl: float = 300):
+        self._server_params = server_params
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._adapters = []
+        self._tools = None
+        self._fetched_at = 0.0
+
+    def get(self) -> types.SimpleNamespace:
+        """Return the cached tools bound by name (ie tools.write_neo4j_cypher), refreshing them once the TTL expires"""
+        if self._tools is None or time.monotonic() - self._fetched_at >= self._ttl:
+            with self._lock:
+                if self._tools is None or time.monotonic() - self._fetched_at >= self._ttl:
+                    self._tools = self._fetch()
+                    self._fetched_at = time.monotonic()
+        return self._tools
+
+    def invalidate(self):
+        """Force the next get() to list the tools again"""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def close(self):
+        """Stop the MCP server subprocesses, the next get() starts them again"""
+        with self._lock:
+            adapters, self._adapters = self._adapters, []
+            self._tools = None
+            for adapter in adapters:
+                adapter.close()
+
+    def _fetch(self) -> types.SimpleNamespace:
+        # Tool calls from any thread are dispatched onto each adapter's own event loop,
+        # where the MCP ClientSession multiplexes requests by id, so crews running
+        # concurrently can share these sessions without extra locking.
+        if not self._adapters:
+            # Start the servers side by side, a cold uvx install can take several seconds each
+            with ThreadPoolExecutor(max_workers=len(self._server_params)) as executor:
+                futures = [executor.submit(_start_mcp_server, params) for params in self._server_params]
+            errors = [future.exception() for future in futures if future.exception()]
+            if errors:
+                # Don't leak the servers that did start, the next get() starts them all again
+                for future in futures:
+                    if not future.exception():
+                        future.result().close()
+                raise errors[0]
+            self._adapters = [future.result() for future in futures]
+
+        # Listed over the live stdio sessions, so a refresh doesn't respawn the servers
+        tool_lists = [adapter.tools() for adapter in self._adapters]
+
+        tools = {tool.name: tool for tool_list in tool_lists for tool in tool_list}
+        logger.debug("Available tools from Stdio MCP servers: %s", list(tools))
+
+        missing = [name for name in REQUIRED_TOOLS if name not in tools]
+        if missing:
+            raise RuntimeError(f"MCP servers are missing required tools: {missing}")
+        return types.SimpleNamespace(**tools)
+
+_mcp_tools = CachedToolset(server_params, ttl=float(os.getenv("MCP_TOOLS_TTL", 300)))
+atexit.register(_mcp_tools.close)
+
+def warm_mcp_servers():
+    """Start the shared MCP servers and list their tools, ie from the app's startup hook"""
+    _mcp_tools.get()
+
+def close_mcp_servers():
+    """Stop the shared MCP servers, ie from the app's shutdown hook"""
+    _mcp_tools.close()
+
+# Neo4j schema, shared by every crew for NEO4J_SCHEMA_TTL seconds
+@functools.lru_cache(maxsize=1)
+def _cached_neo4j_schema(neo4j_uri: str, database: str, ttl_bucket: int) -> str:
+    schema = _mcp_tools.get().get_neo4j_schema.run()
+    # The server answers with the schema as JSON, while failures come back as plain error text.
+    # Raising keeps those out of the cache, the agent sees the error and the next call retries
+    try:
+        json.loads(schema)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"get_neo4j_schema failed: {str(schema)[:500]}")
+    return schema
+
+@tool("get_neo4j_schema")
+def cached_neo4j_schema_tool() -> str:
+    """List all node labels, relationship types and properties in the neo4j database."""
+    ttl = float(os.getenv("NEO4J_SCHEMA_TTL", 300))
+    return _cached_neo4j_schema(os.getenv("NEO4J_URI"), os.getenv("NEO4J_DATABASE", "neo4j"), int(time.monotonic() // ttl))
+
 # Available tools names:
 # ['validate_node', 'validate_relationship', 'validate_data_model', 'load_from_arrows_json', 'export_to_arrows_json', 'get_mermaid_config_str', 'get_node_cypher_ingest_query', 'get_relationship_cypher_ingest_query', 'get_constraints_cypher_queries', 'get_neo4j_schema', 'read_neo4j_cypher', 'write_neo4j_cypher']
 
 # Optionally logging callbacks from Agents & Tasks
+# Only formatted when debug logging is enabled (ie uvicorn --log-level debug)
 def log_step_callback(output):
-    print(
-        f"""
-        Step completed!
-        details: {output.__dict__}
-    """
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[%s] Step completed! type=%s tool=%s result=%.500s",
+            get_request_id(),
+            type(output).__name__,
+            getattr(output, "tool", None),
+            getattr(output, "result", getattr(output, "output", None)),
+        )
+
+def read_step_callback(output):
+    """Step callback for schema reading agents, keeps large schema payloads out of later prompts"""
+    stash_schema_step(output)
+    log_step_callback(output)
 
 def log_task_callback(output):
-    print(
-        f"""
-        Task completed!
-        details: {output.__dict__}
-    """
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "[%s] Task completed! name=%s agent=%s raw=%.500s",
+            get_request_id(),
+            output.name,
+            output.agent,
+            output.raw,
+        )
+
+def index_task_callback(output):
+    """Task callback for data modelling tasks, indexes the KEY properties of the new model before any data is merged"""
+    ensure_indexes(output.raw)
+    log_task_callback(output)
 
 # Agent definitions
-def mcp_agent(tools):
+def _chain_callbacks(*callbacks):
+    """Combine step callbacks into one, skipping any that are None"""
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+
+    def chained(output):
+        for callback in callbacks:
+            callback(output)
+    return chained
+
+def mcp_agent(tools, step_callback=None, step_listener=None):
+    """
+    step_listener is also called for every step, ie to stream progress back to a client.
+    Callbacks run under the request id current when the agent is built, whichever thread calls them
+    """
+    # Agents are built per crew on purpose: a crew binds its agents (crew, executor, step callbacks),
+    # so concurrent kickoffs can't share them. The costly parts, the MCP tools and the LLM, are shared.
     return Agent(
         role="MCP Tool User",
         goal="Utilize tools from MCP servers.",
         backstory="I can connect to MCP servers and use their tools.",
-        tools=tools,
+        llm=create_agent_llm(),
         reasoning=False,  # Optional
         verbose=False,  # Optional
-        step_callback=log_step_callback,  # Optional
+        step_callback=bind_request_id(_chain_callbacks(
+            step_callback or (log_step_callback if os.getenv("CREW_VERBOSE") else None),  # Optional
+            step_listener,
+        )),
+        **cancellable_agent_settings(tools),
     )
 
+# Task descriptions
+# Built once at import time and shared by every Task instance
+
+# Formatting rules shared by every task that outputs a mermaid config
+_MERMAID_OUTPUT_RULES = """
+    Relationships should NOT have KEYs
+    Output should NOT contain any explanatory text
+    Output should NOT contain backticks
+    Output should NOT contain code blocks
+    Output should NOT contain mermaid styling.
+"""
+
+_CONNECTED_GRAPH_RULES = """
+    MAKE CERTAIN to create a connected graph (where all nodes have a path to all other nodes).
+    Add additional Nodes and Relationships to create a connected graph.
+"""
+
+_UNWIND_RULES = """
+    Write ONE query per node label, shaped as:
+    UNWIND $records AS rec MERGE (n:Label {id: rec.id}) ON CREATE SET n = rec ON MATCH SET n += rec
+    where id is the property marked KEY for that label in the data model,
+    and ONE query per relationship type, shaped as:
+    UNWIND $records AS rec MATCH (a:FromLabel {id: rec.from}), (b:ToLabel {id: rec.to}) MERGE (a)-[r:TYPE]->(b) SET r += rec.props
+    Do NOT write one CREATE or MERGE statement per row.
+    Output ONLY a JSON object, with the rows for each query in its params, shaped as:
+    {"node_batches": [{"query": "...", "params": {"records": [...]}}], "relationship_batches": [{"query": "...", "params": {"records": [...]}}]}
+"""
+
+_WRITE_BATCHES_RULES = """
+    Run every query from the node_batches first, then every query from the relationship_batches,
+    each with the write_neo4j_cypher tool, passing its params unchanged.
+"""
+
+_READ_DATA_DESC = """
+    Read the existing schema and data of the neo4j database.
+    If a tool result contains a schema_ref, include it verbatim in your answer.
+"""
+
+_CREATE_MERMAID_CONTEXT_ONLY_DESC = """
+    Generate a mermaid graph TD chart config file for the given usecase: {usecase}
+
+    Add properties to each entity to provide more context and detail.
+    Add relationships to each entity to provide more context and detail.
+    Each entity MUST be the source of 1 or more relationships.
+    Each entity MUST be the target of 1 or more relationships.
+""" + _MERMAID_OUTPUT_RULES
+
+# Templates for descriptions rendered when the task is built, $-placeholders not given
+# to safe_substitute (ie $records in the cypher examples) are left untouched
+_GENERATE_CYPHER_TPL = string.Template("""
+    Create mock data as cypher queries from the context data and the mermaid graph given at the end.
+""" + _UNWIND_RULES + """
+    Mermaid graph:
+    ${mermaid_config}
+""")
+
+_GENERATE_CYPHER_WITH_CONTEXT_DESC = """
+    Create mock data as cypher queries from the context data
+""" + _UNWIND_RULES
+
+_GENERATE_DATA_TPL = string.Template("""
+    Construct and upload a synthetic graph dataset, based on context data and the mermaid graph given at the end.
+""" + _WRITE_BATCHES_RULES + """
+    Source mermaid config: 
+    ${mermaid_config}
+""")
+
+_GENERATE_DATA_WITH_CONTEXT_DESC = """
+    Add and upload a synthetic graph dataset based on the context data.
+""" + _WRITE_BATCHES_RULES
+
+_EXPANDED_MERMAID_DESC = """
+    Expand the existing graph dataset based on the context data.
+""" + _CONNECTED_GRAPH_RULES
+
+_MERMAID_EXPECTED_OUTPUT = "A valid Mermaid Graph TB chart config file"
+_CYPHER_EXPECTED_OUTPUT = 'JSON object {"node_batches": [...], "relationship_batches": [...]} of parameterized UNWIND queries and their $records'
+_UPLOAD_EXPECTED_OUTPUT = "A string status report of the data upload process"
+
 # Task definitions
-def read_data_task(agent)->Task:
+def read_data_task(agent, async_execution: bool = False)->Task:
     return Task(
-            description="""
-                Read the existing schema and data of the neo4j database.
-            """,
+            description=_READ_DATA_DESC,
             expected_output="The existing schema and data of the neo4j database",
             agent=agent,
-            callback=log_task_callback,  # Optional
+            async_execution=async_execution,
+            callback=bind_request_id(log_task_callback),  # Optional
         )
 
-def generate_cypher_task(agent, context)->Task:
-    # Create cypher ingest queries
+def create_mermaid_graph_task_context_only(agent, context, async_execution: bool = False)->Task:
+    # Usecase will be passed as input
     return Task(
-        description="""
-            Create mock data as cypher queries from the context data and following mermaid graph:
+        description=_CREATE_MERMAID_CONTEXT_ONLY_DESC,
+        expected_output=_MERMAID_EXPECTED_OUTPUT,
+        agent=agent,
+        context=context,
+        async_execution=async_execution,
+        guardrail=connected_mermaid_guardrail,
+        callback=bind_request_id(index_task_callback),
+    )
 
-            {mermaid_graph}
-        """,
-        expected_output="Parameterized Cypher query for bulk ingestion (using $records)",
+def generate_cypher_task(agent, context, mermaid_config: str)->Task:
+    # Create cypher ingest queries
+    return Task(
+        description=_GENERATE_CYPHER_TPL.safe_substitute(mermaid_config=mermaid_config),
+        expected_output=_CYPHER_EXPECTED_OUTPUT,
+        output_pydantic=CypherPlan,
         agent=agent,
         context=context,
-        callback=log_task_callback,  # Optional
+        guardrail=unwind_guardrail,
+        callback=bind_request_id(log_task_callback),  # Optional
     )
 
 def generate_cypher_task_with_context(agent, context)->Task:
     # Create cypher ingest queries
     return Task(
-        description="""
-            Create mock data as cypher queries from the context data
-        """,
-        expected_output="Parameterized Cypher query for bulk ingestion (using $records)",
+        description=_GENERATE_CYPHER_WITH_CONTEXT_DESC,
+        expected_output=_CYPHER_EXPECTED_OUTPUT,
+        output_pydantic=CypherPlan,
         agent=agent,
         context=context,
-        callback=log_task_callback,  # Optional
+        guardrail=unwind_guardrail,
+        callback=bind_request_id(log_task_callback),  # Optional
     )
 
-def generate_data_task(agent, context)->Task:    
-    # Mermaid graph will be passed as input
+def generate_data_task(agent, context, mermaid_config: str)->Task:    
+    # Mermaid graph is rendered into the description, so the crew needs no kickoff inputs
     return Task(
-        description="""
-            Construct and upload a synthetic graph dataset, based on context data and following mermaid graph:
-
-            Source mermaid config: 
-            {mermaid_config}
-
-            MAKE CERTAIN to create a connected graph (where all nodes have a path to all other nodes).
-            Add additional Nodes and Relationships to create a connected graph.
-        """,
-        expected_output="A string status report of the data upload process",
+        description=_GENERATE_DATA_TPL.safe_substitute(mermaid_config=mermaid_config),
+        expected_output=_UPLOAD_EXPECTED_OUTPUT,
         agent=agent,
         context=context,
-        callback=log_task_callback,  # Optional
+        callback=bind_request_id(log_task_callback),  # Optional
     )
 
 def generate_data_task_with_context(agent, context)->Task: 
     # Mermaid graph and counts will be passed in from prior tasks
     return Task(
-        description="""
-            Add and upload a synthetic graph dataset based on the context data.
-            
-            MAKE CERTAIN to create a connected graph (where all nodes have a path to all other nodes).
-            Add additional Nodes and Relationships to create a connected graph.
-        """,
-        expected_output="A string status report of the data upload process",
+        description=_GENERATE_DATA_WITH_CONTEXT_DESC,
+        expected_output=_UPLOAD_EXPECTED_OUTPUT,
         agent=agent,
         context=context,
-        callback=log_task_callback,  # Optional
+        callback=bind_request_id(log_task_callback),  # Optional
     )
 
 def expanded_mermaid_graph_task(agent, context)->Task: 
     # Mermaid graph and counts will be passed in from prior tasks
     return Task(
-        description="""
-            Expand the existing graph dataset based on the context data.
-            
-            MAKE CERTAIN to create a connected graph (where all nodes have a path to all other nodes).
-            Add additional Nodes and Relationships to create a connected graph.
-        """,
-        expected_output="A string status report of the data upload process",
+        description=_EXPANDED_MERMAID_DESC,
+        expected_output=_UPLOAD_EXPECTED_OUTPUT,
         agent=agent,
         context=context,
-        callback=log_task_callback,  # Optional
+        callback=bind_request_id(index_task_callback),
     )
 
-# Convenience Neo4j Function
-def trim_orphan_nodes() -> str:
+# Convenience Neo4j Functions
+_neo4j_driver = None
+_neo4j_driver_lock = threading.Lock()
+
+def _get_driver():
+    """Return the process wide Neo4j driver, creating its connection pool on first use"""
+    global _neo4j_driver
+    if _neo4j_driver is None:
+        with _neo4j_driver_lock:
+            if _neo4j_driver is None:
+                neo4j_uri = os.getenv("NEO4J_URI")
+                neo4j_user = os.getenv("NEO4J_USERNAME")
+                neo4j_password = os.getenv("NEO4J_PASSWORD")
+
+                _neo4j_driver = GraphDatabase.driver(
+                    neo4j_uri,
+                    auth=(neo4j_user, neo4j_password),
+                    max_connection_pool_size=int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", 50)),
+                    connection_acquisition_timeout=60,
+                    max_connection_lifetime=3600,
+                )
+                atexit.register(close_neo4j_driver)
+    return _neo4j_driver
+
+def close_neo4j_driver():
+    """Close the pooled Neo4j driver, ie from the app's shutdown hook. The next query opens a new one"""
+    global _neo4j_driver
+    with _neo4j_driver_lock:
+        driver, _neo4j_driver = _neo4j_driver, None
+    if driver is not None:
+        driver.close()
+
+def ensure_indexes(mermaid_graph: str):
+    """Create an index for every KEY property in a mermaid graph, so the UNWIND ... MERGE batches don't scan whole labels"""
+
+    driver = _get_driver()
+    for query in index_queries(mermaid_graph):
+        try:
+            driver.execute_query(query)
+        except (Neo4jError, DriverError) as e:
+            # ie a uniqueness constraint already covers the property, or the database is unreachable.
+            # Indexes only speed up the merges, so the run goes on without them
+            logger.warning("Skipping %s: %s", query, e)
+
+def trim_orphan_nodes():
     """Removes any nodes that are not connected to any other nodes - using the Neo4j driver"""
     
-    neo4j_uri = os.getenv("NEO4J_URI")
-    neo4j_user = os.getenv("NEO4J_USERNAME")
-    neo4j_password = os.getenv("NEO4J_PASSWORD")
-    
-    with GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password)) as driver:
-        cypher_query = "MATCH (n) WHERE NOT (n)--() DELETE n"
-        result = driver.execute_query(cypher_query)
-        return result
+    driver = _get_driver()
+
+    # Stops at the first orphan, so a clean graph (the usual case after a generate)
+    # skips the delete and its write locks entirely
+    records, _, _ = driver.execute_query(
+        "MATCH (n) WHERE NOT (n)--() RETURN 1 AS found LIMIT 1",
+        routing_=RoutingControl.READ,
+    )
+    if not records:
+        return 0
+
+    # Trim label by label so each pass uses the label scan store instead of scanning all nodes,
+    # then make one pass for orphans without any label, which no label pass reaches.
+    # CALL { ... } IN TRANSACTIONS needs an auto-commit transaction, hence session.run.
+    # The importing WITH form runs on Neo4j 4.4 and later (the CALL (n) scope form needs 5.23)
+    records, _, _ = driver.execute_query("CALL db.labels() YIELD label RETURN label", routing_=RoutingControl.READ)
+    matches = [f"MATCH (n:`{record['label'].replace('`', '``')}`) WHERE NOT (n)--()" for record in records]
+    matches.append("MATCH (n) WHERE size(labels(n)) = 0 AND NOT (n)--()")
+    nodes_deleted = 0
+    with driver.session() as session:
+        for match in matches:
+            cypher_query = f"""
+                {match}
+                CALL {{ WITH n DELETE n }} IN TRANSACTIONS OF 10000 ROWS
+            """
+            nodes_deleted += session.run(cypher_query).consume().counters.nodes_deleted
+    return nodes_deleted
+
+# Crews writing to Neo4j run concurrently, and each merges its nodes before it connects them.
+# A trim while another one is writing would delete its not yet connected nodes, so trims only
+# run when no writing crew is in flight. The last crew to finish trims for the others
+_graph_writers = 0
+_graph_writers_lock = threading.Lock()
+
+def _kickoff_writing(crew, inputs: dict | None = None):
+    """crew.kickoff for crews that write to Neo4j, counted so trim_orphan_nodes_if_idle waits its turn"""
+    global _graph_writers
+    with _graph_writers_lock:
+        _graph_writers += 1
+    try:
+        return crew.kickoff(inputs=inputs)
+    finally:
+        with _graph_writers_lock:
+            _graph_writers -= 1
+
+def trim_orphan_nodes_if_idle():
+    """trim_orphan_nodes, unless another crew is still writing. Returns the nodes deleted, or None when skipped"""
+    # Held for the whole trim, so no writing crew starts halfway through it
+    with _graph_writers_lock:
+        if _graph_writers:
+            logger.info("[%s] Skipping orphan trim, %d crews are still writing", get_request_id(), _graph_writers)
+            return None
+        return trim_orphan_nodes()
+
+# Seconds a generated mermaid graph is reused for identical requests
+MERMAID_CACHE_TTL = float(os.getenv("MERMAID_CACHE_TTL", 3600))
 
 # MCP powered functions
-def create_mermaid_graph(usecase: str, entities: list[str] = [], relationships: list[str]= []):
+def mermaid_graph_key(usecase: str, entities: list[str] = [], relationships: list[str] = [], step_listener=None) -> tuple:
+    """Cache key of a create_mermaid_graph call. Surrounding whitespace, as typed into the query string, doesn't change the graph"""
+    return (
+        usecase.strip(),
+        tuple(entity.strip() for entity in entities or ()),
+        tuple(relationship.strip() for relationship in relationships or ()),
+    )
+
+@memoized(
+    mermaid_graph_key,
+    maxsize=int(os.getenv("MERMAID_CACHE_SIZE", 512)),
+    ttl=MERMAID_CACHE_TTL,
+)
+def create_mermaid_graph(usecase: str, entities: list[str] = [], relationships: list[str]= [], step_listener=None):
     """
     Create a data model and return either a Mermaid graph
     """
-    with MCPServerAdapter(server_params) as tools:
-
-        print(f"Available tools from Stdio MCP server: {[tool.name for tool in tools]}")
-                
-        crew = CreateMermaidCrew([tools["get_neo4j_schema"], tools["read_neo4j_cypher"],tools["validate_data_model"], tools["get_mermaid_config_str"]]).crew()
+    tools = _mcp_tools.get()
+    # fetch_schema follows the schema_ref the read task leaves in place of the full schema
+    crew_tools = [cached_neo4j_schema_tool, tools.validate_data_model, tools.get_mermaid_config_str, fetch_schema]
 
+    # Usecase only - leave the empty include lists out of the prompt entirely
+    if not entities and not relationships:
+        crew = CreateMermaidMinimalCrew(crew_tools, step_listener).crew()
+        inputs = {
+            'usecase': usecase
+        }
+    else:
+        crew = CreateMermaidCrew(crew_tools, step_listener).crew()
         inputs = {
             'usecase': usecase,
             'entities': entities,
             'relationships': relationships
         }
-        result = crew.kickoff(inputs=inputs)
-        return result
+    result = cached_kickoff(crew, inputs)
+    return result
 
-def edit_mermaid_graph(instructions: str, mermaid_config: str):
+def edit_mermaid_graph(instructions: str, mermaid_config: str, step_listener=None):
     """Edit a mermaid chart config file."""
-    with MCPServerAdapter(server_params) as tools:
-        print(f"Available tools from Stdio MCP server: {[tool.name for tool in tools]}")
+    tools = _mcp_tools.get()
         
-        try: 
+    try: 
             
-            crew = EditMermaidCrew([tools["validate_data_model"], tools["get_mermaid_config_str"]]).crew()
+        crew = EditMermaidCrew([tools.validate_data_model, tools.get_mermaid_config_str], step_listener).crew()
             
-            inputs = {
-                'instructions': instructions,
-                'mermaid_config': mermaid_config
-            }
-
-            result = crew.kickoff(inputs=inputs)
-            return result
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Error details: {error_trace}")
-            raise Exception(f"An error occurred while running the crew: {str(e)}\n\nTraceback:\n{error_trace}")
-
-def generate_data(mermaid_graph: str):
+        inputs = {
+            'instructions': instructions,
+            'mermaid_config': mermaid_config
+        }
+
+        result = cached_kickoff(crew, inputs)
+        return result
+    except CrewCancelled:
+        raise
+    except Exception as e:
+        logger.exception("An error occurred while running the crew")
+        raise RuntimeError(f"An error occurred while running the crew: {e}") from e
+
+def generate_data(mermaid_graph: str, step_listener=None):
     """Generate data from a mermaid chart config file."""
 
-    with MCPServerAdapter(server_params) as tools:
+    tools = _mcp_tools.get()
 
-        print(f"Available tools from Stdio MCP server: {[tool.name for tool in tools]}")
+    # Bridge any disconnected parts of the model up front instead of asking the write agent to
+    mermaid_graph = connect_mermaid(mermaid_graph)
         
-        try:
+    try:
 
-            # Two step process works better
-            # When combined sometimes the agent/task won't do the final upload to Neo4j
-            read_agent = mcp_agent([tools["get_neo4j_schema"], tools["read_neo4j_cypher"], tools["get_mermaid_config_str"]])
-            cypher_agent = mcp_agent([tools["get_node_cypher_ingest_query"], tools["get_relationship_cypher_ingest_query"]])
-            write_agent = mcp_agent([tools["write_neo4j_cypher"]])
+        # Two step process works better
+        # When combined sometimes the agent/task won't do the final upload to Neo4j
+        read_agent = mcp_agent([cached_neo4j_schema_tool], step_callback=read_step_callback, step_listener=step_listener)
+        cypher_agent = mcp_agent([tools.get_node_cypher_ingest_query, tools.get_relationship_cypher_ingest_query, fetch_schema], step_listener=step_listener)
+        write_agent = mcp_agent([tools.write_neo4j_cypher], step_listener=step_listener)
             
-            read_task = read_data_task(read_agent)
-            cypher_task = generate_cypher_task(cypher_agent, [read_task])
-            write_task = generate_data_task(write_agent, [cypher_task])
-
-            crew = Crew(
-                    agents=[read_agent, write_agent],
-                    tasks=[read_task, write_task],  # Use the instantiated task objects
-                    process=Process.sequential,
-                    verbose=True,
-                )
+        read_task = read_data_task(read_agent)
+        cypher_task = generate_cypher_task(cypher_agent, [read_task], mermaid_graph)
+        write_task = generate_data_task(write_agent, [cypher_task], mermaid_graph)
+
+        crew = Crew(
+                agents=[read_agent, cypher_agent, write_agent],
+                tasks=[read_task, cypher_task, write_task],  # Use the instantiated task objects
+                process=Process.sequential,
+                verbose=True,
+            )
             
-            inputs = {
-                'mermaid_config': mermaid_graph,
-            }
-
-            result = crew.kickoff(inputs=inputs)
-            return result
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Error details: {error_trace}")
-            raise Exception(f"An error occurred while running the crew: {str(e)}\n\nTraceback:\n{error_trace}")
-
-def generate_data_for_usecase(usecase: str):
+        ensure_indexes(mermaid_graph)
+        # No inputs - the descriptions are already rendered, which skips CrewAI's
+        # interpolation pass and keeps braces in the mermaid text from being read as placeholders
+        result = _kickoff_writing(crew)
+        _cached_neo4j_schema.cache_clear()
+        return result
+    except CrewCancelled:
+        raise
+    except Exception as e:
+        logger.exception("An error occurred while running the crew")
+        raise RuntimeError(f"An error occurred while running the crew: {e}") from e
+
+def _generate_data_for_usecase_crew(tools, step_listener=None) -> Crew:
+    """Build the crew that models, generates and uploads a graph data set for a usecase"""
+
+    # Read existing schema and generate the Data Model concurrently - the model is
+    # drafted from the usecase alone and both are joined by the cypher task
+    read_agent = mcp_agent([cached_neo4j_schema_tool], step_callback=read_step_callback, step_listener=step_listener)
+    schema_task = read_data_task(read_agent, async_execution=True)
+
+    # Drafted without the schema in context, so there is no schema_ref for fetch_schema to follow
+    data_modeling_agent = mcp_agent([tools.validate_data_model, tools.get_mermaid_config_str], step_listener=step_listener)
+    data_modeling_task = create_mermaid_graph_task_context_only(data_modeling_agent, [], async_execution=True)
+        
+    # Generate recommended nodes and counts
+    cypher_agent = mcp_agent([tools.get_node_cypher_ingest_query, tools.get_relationship_cypher_ingest_query, fetch_schema], step_listener=step_listener)
+    cypher_task = generate_cypher_task_with_context(cypher_agent, [schema_task, data_modeling_task])
+
+    # Generate the Data
+    write_agent = mcp_agent([tools.write_neo4j_cypher], step_listener=step_listener)
+    write_task = generate_data_task_with_context(write_agent, [cypher_task])
+
+    # Trim any unconnected nodes using MCP Server
+    # trim_task = trim_orphan_nodes_task(write_agent)
+
+    # Create crew instance with configurations
+    return Crew(
+        agents=[read_agent,data_modeling_agent,cypher_agent, write_agent],
+        tasks=[schema_task, data_modeling_task, cypher_task, write_task],
+        process=Process.sequential,
+        verbose=True,
+    )
+
+def generate_data_for_usecase(usecase: str, step_listener=None):
     "Creates a graph data set from a single usce case prompt"
 
-    with MCPServerAdapter(server_params) as tools:
-        print(f"Available tools from Stdio MCP server: {[tool.name for tool in tools]}")
+    tools = _mcp_tools.get()
         
-        try:
+    try:
 
-            # Read existing schema
-            read_agent = mcp_agent([tools["get_neo4j_schema"], tools["read_neo4j_cypher"]])
-            schema_task = read_data_task(read_agent)
+        crew = _generate_data_for_usecase_crew(tools, step_listener)
 
-            # Generate the Data Model
-            data_modeling_agent = mcp_agent([tools["validate_data_model"], tools["get_mermaid_config_str"]])
-            data_modeling_task = create_mermaid_graph_task_context_only(data_modeling_agent, [schema_task])
-            
-            # Generate recommended nodes and counts
-            cypher_agent = mcp_agent([tools["get_node_cypher_ingest_query"], tools["get_relationship_cypher_ingest_query"]])
-            cypher_task = generate_cypher_task_with_context(cypher_agent, [data_modeling_task])
+        inputs = {
+            'usecase': usecase
+        }
 
-            # Generate the Data
-            write_agent = mcp_agent([tools["write_neo4j_cypher"]])
-            write_task = generate_data_task_with_context(write_agent, [cypher_task])
+        result = _kickoff_writing(crew, inputs)
+        _cached_neo4j_schema.cache_clear()
 
-            # Trim any unconnected nodes using MCP Server
-            # trim_task = trim_orphan_nodes_task(write_agent)
+        # Trim unconnected nodes using Python driver
+        trim_orphan_nodes_if_idle()
 
-            # Create crew instance with configurations
-            crew = Crew(
-                agents=[read_agent,data_modeling_agent,cypher_agent, write_agent],
-                tasks=[schema_task, data_modeling_task, cypher_task, write_task],
-                process=Process.sequential,
-                verbose=True,
-            )
+        return result
+    except CrewCancelled:
+        raise
+    except Exception as e:
+        logger.exception("An error occurred while running the crew")
+        raise RuntimeError(f"An error occurred while running the crew: {e}") from e
 
-            inputs = {
-                'usecase': usecase
-            }
+async def generate_data_for_usecase_async(usecase: str, trim: bool = True, step_listener=None):
+    """Async version of generate_data_for_usecase, so several usecases can run concurrently"""
 
-            result = crew.kickoff(inputs=inputs)
+    tools = await asyncio.to_thread(_mcp_tools.get)
 
-            # Trim unconnected nodes using Python driver
-            trim_orphan_nodes()
+    try:
 
-            return result
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Error details: {error_trace}")
-            raise Exception(f"An error occurred while running the crew: {str(e)}\n\nTraceback:\n{error_trace}")
+        crew = _generate_data_for_usecase_crew(tools, step_listener)
 
-def expand_data_for_usecase(usecase: str):
-    with MCPServerAdapter(server_params) as tools:
-        print(f"Available tools from Stdio MCP server: {[tool.name for tool in tools]}")
-        
-        try:
+        inputs = {
+            'usecase': usecase
+        }
 
-            # Read existing schema
-            read_agent = mcp_agent([tools["get_neo4j_schema"], tools["read_neo4j_cypher"]])
-            schema_task = read_data_task(read_agent)
+        result = await run_crew_in_executor(_kickoff_writing, crew, inputs)
+        _cached_neo4j_schema.cache_clear()
 
-            # Generate the Data Model
-            data_modeling_agent = mcp_agent([tools["validate_data_model"], tools["get_mermaid_config_str"]])
-            data_modeling_task = expanded_mermaid_graph_task(data_modeling_agent, [schema_task])
-            
-            # Generate recommended nodes and counts
-            cypher_agent = mcp_agent([tools["get_node_cypher_ingest_query"], tools["get_relationship_cypher_ingest_query"]])
-            cypher_task = generate_cypher_task_with_context(cypher_agent, [data_modeling_task])
+        if trim:
+            await asyncio.to_thread(trim_orphan_nodes_if_idle)
 
-            # Generate the Data
-            write_agent = mcp_agent([tools["write_neo4j_cypher"]])
-            write_task = generate_data_task_with_context(write_agent, [cypher_task])
+        return result
+    except CrewCancelled:
+        raise
+    except Exception as e:
+        logger.exception("An error occurred while running the crew")
+        raise RuntimeError(f"An error occurred while running the crew: {e}") from e
 
-            # Trim any orphaned nodes
-            # trim_task = trim_orphan_nodes_task(write_agent)
 
-            # Create crew instance with configurations
-            crew = Crew(
-                agents=[read_agent,data_modeling_agent,cypher_agent, write_agent],
-                tasks=[schema_task, data_modeling_task, cypher_task, write_task],
-                process=Process.sequential,
-                verbose=True,
-            )
+async def _run_parallel_phase(coroutines, limit: int = MAX_PARALLEL_CREWS) -> list:
+    """
+    Await independent crew coroutines concurrently, at most `limit` at a time, returning their results in order.
+    A coroutine that fails has its exception in its place instead, and the others still run to completion.
+    """
+    semaphore = asyncio.Semaphore(limit)
 
-            inputs = {
-                'usecase': usecase
-            }
-            result = crew.kickoff(inputs=inputs)
+    async def bounded(coroutine):
+        try:
+            async with semaphore:
+                return await coroutine
+        finally:
+            # No-op once awaited, keeps one cancelled while waiting for the semaphore from warning it was never awaited
+            coroutine.close()
 
-            trim_orphan_nodes()
+    return await asyncio.gather(*[bounded(coroutine) for coroutine in coroutines], return_exceptions=True)
 
-            return result
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Error details: {error_trace}")
-            raise Exception(f"An error occurred while running the crew: {str(e)}\n\nTraceback:\n{error_trace}")
\ No newline at end of file
+async def batch_generate(usecases: list[str]) -> list[dict]:
+    """
+    Generate graph data sets for several usecases concurrently.
+    Returns {"usecase": ..., "result": ...} per usecase, or {"usecase": ..., "error": ...} for one that failed.
+    """
+    try:
+        results = await _run_parallel_phase([generate_data_for_usecase_async(usecase, trim=False) for usecase in usecases])
+    finally:
+        # Trim once all crews are done, so one crew can't delete nodes
+        # another is still connecting. Failed crews may have left orphans too
+        await asyncio.to_thread(trim_orphan_nodes_if_idle)
+
+    return [
+        {"usecase": usecase, "error": str(result)} if isinstance(result, Exception) else {"usecase": usecase, "result": result}
+        for usecase, result in zip(usecases, results)
+    ]
+
+def expand_data_for_usecase(usecase: str, step_listener=None):
+    tools = _mcp_tools.get()
+        
+    try:
+
+        # Read existing schema
+        read_agent = mcp_agent([cached_neo4j_schema_tool], step_callback=read_step_callback, step_listener=step_listener)
+        schema_task = read_data_task(read_agent)
+
+        # Generate the Data Model
+        data_modeling_agent = mcp_agent([tools.validate_data_model, tools.get_mermaid_config_str, fetch_schema], step_listener=step_listener)
+        data_modeling_task = expanded_mermaid_graph_task(data_modeling_agent, [schema_task])
+            
+        # Generate recommended nodes and counts
+        cypher_agent = mcp_agent([tools.get_node_cypher_ingest_query, tools.get_relationship_cypher_ingest_query, fetch_schema], step_listener=step_listener)
+        cypher_task = generate_cypher_task_with_context(cypher_agent, [data_modeling_task])
+
+        # Generate the Data
+        write_agent = mcp_agent([tools.write_neo4j_cypher], step_listener=step_listener)
+        write_task = generate_data_task_with_context(write_agent, [cypher_task])
+
+        # Trim any orphaned nodes
+        # trim_task = trim_orphan_nodes_task(write_agent)
+
+        # Create crew instance with configurations
+        crew = Crew(
+            agents=[read_agent,data_modeling_agent,cypher_agent, write_agent],
+            tasks=[schema_task, data_modeling_task, cypher_task, write_task],
+            process=Process.sequential,
+            verbose=True,
+        )
+
+        inputs = {
+            'usecase': usecase
+        }
+        result = _kickoff_writing(crew, inputs)
+        _cached_neo4j_schema.cache_clear()
+
+        trim_orphan_nodes_if_idle()
+
+        return result
+    except CrewCancelled:
+        raise
+    except Exception as e:
+        logger.exception("An error occurred while running the crew")
+        raise RuntimeError(f"An error occurred while running the crew: {e}") from e
\ No newline at end of file
@@ -0,0 +1,83 @@
+from mermaid_parser import parse_mermaid
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Tuple
+import re
+import os
+
+# Unbatched CREATE/MERGE statements tolerated before a cypher plan is sent back for a retry
+MAX_STMTS = int(os.getenv("MAX_UNBATCHED_STATEMENTS", 2))
+
+# Rows sent to write_neo4j_cypher per query
+BATCH_SIZE = int(os.getenv("CYPHER_BATCH_SIZE", 1000))
+
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_WRITE_RE = re.compile(r"\b(CREATE|MERGE)\b", re.IGNORECASE)
+_UNWIND_RE = re.compile(r"\bUNWIND\b", re.IGNORECASE)
+
+class CypherParams(BaseModel):
+    records: list[dict[str, Any]] = Field(default_factory=list, description="Rows bound to $records")
+
+class CypherBatch(BaseModel):
+    query: str = Field(description="Parameterized UNWIND $records query")
+    params: CypherParams = Field(default_factory=CypherParams)
+
+class CypherPlan(BaseModel):
+    """Structured output of the cypher generation tasks"""
+    node_batches: list[CypherBatch]
+    relationship_batches: list[CypherBatch]
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+def index_queries(mermaid_graph: str) -> list[str]:
+    """CREATE INDEX IF NOT EXISTS statements for the KEY property of every node label in a mermaid graph"""
+    return [
+        f"CREATE INDEX IF NOT EXISTS FOR (n:{_quote(label)}) ON (n.{_quote(node['key'])})"
+        for label, node in parse_mermaid(mermaid_graph)["nodes"].items()
+        if node["key"]
+    ]
+
+def chunk_batches(batches: list[CypherBatch], size: int = BATCH_SIZE) -> list[CypherBatch]:
+    """Split every batch into batches of at most `size` records"""
+    chunked = []
+    for batch in batches:
+        records = batch.params.records
+        if len(records) <= size:
+            chunked.append(batch)
+            continue
+        for start in range(0, len(records), size):
+            chunked.append(batch.model_copy(update={"params": CypherParams(records=records[start:start + size])}))
+    return chunked
+
+def unwind_guardrail(output) -> Tuple[bool, Any]:
+    """
+    Task guardrail for the CypherPlan written by the cypher generation tasks.
+    CrewAI retries the task with the returned error when the output is not a valid
+    CypherPlan, or when more than MAX_STMTS of its CREATE/MERGE queries are not
+    driven by an UNWIND batch.
+    Accepted plans are passed on with their records split into BATCH_SIZE rows.
+    """
+    plan = output.pydantic if isinstance(output.pydantic, CypherPlan) else None
+    if plan is None:
+        try:
+            plan = CypherPlan.model_validate_json(_CODE_FENCE_RE.sub("", output.raw))
+        except ValidationError as e:
+            return (False, f'Output must be a JSON object shaped as {{"node_batches": [...], "relationship_batches": [...]}}: {e}')
+
+    unbatched = [
+        batch.query for batch in plan.node_batches + plan.relationship_batches
+        if _WRITE_RE.search(batch.query) and not _UNWIND_RE.search(batch.query)
+    ]
+    if len(unbatched) > MAX_STMTS:
+        return (
+            False,
+            f"Found {len(unbatched)} CREATE/MERGE queries without UNWIND. "
+            "Write one `UNWIND $records AS rec MERGE ...` query per node label "
+            "and one `UNWIND $records AS rec MATCH ... MERGE ...` query per relationship type.",
+        )
+
+    plan = CypherPlan(
+        node_batches=chunk_batches(plan.node_batches),
+        relationship_batches=chunk_batches(plan.relationship_batches),
+    )
+    return (True, plan.model_dump_json())
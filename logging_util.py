@@ -1,16 +1,51 @@
 from fastapi import HTTPException
 from typing import cast, TypeVar, Callable, Any
+from contextvars import ContextVar
+from contextlib import contextmanager
 import time
 import logging
 import functools
-import datetime
 
 # Type variable for generic function type
 F = TypeVar('F', bound=Callable[..., Any])
 
+_LOGGER = logging.getLogger("uvicorn.error")
+
+# Id of the request being handled, set by time_logging and readable from any callback it awaits
+_REQ_ID: ContextVar[str] = ContextVar("req_id", default="-")
+
 def get_request_logger():
     """Get a logger that will output to Uvicorn's error stream"""
-    return logging.getLogger("uvicorn.error")
+    return _LOGGER
+
+def get_request_id() -> str:
+    """Return the id time_logging gave the current request, or "-" outside of one"""
+    return _REQ_ID.get()
+
+@contextmanager
+def request_id_context(request_id: str):
+    """Make request_id the current request id for the duration of the block"""
+    token = _REQ_ID.set(request_id)
+    try:
+        yield
+    finally:
+        _REQ_ID.reset(token)
+
+def bind_request_id(callback: Callable[[Any], Any] | None) -> Callable[[Any], Any] | None:
+    """
+    Wrap a callback so it runs under the request id that is current now.
+    CrewAI runs async_execution tasks on plain threads that don't copy contextvars,
+    so callbacks built with the crew would otherwise log "-" from there.
+    """
+    if callback is None:
+        return None
+    request_id = get_request_id()
+
+    @functools.wraps(callback)
+    def bound(*args, **kwargs):
+        with request_id_context(request_id):
+            return callback(*args, **kwargs)
+    return bound
 
 # Decorator to add consistent time logging to all endpoints
 def time_logging(endpoint_name: str = None):
@@ -19,47 +54,52 @@ def time_logging(endpoint_name: str = None):
     Automatically logs start, completion, and errors with timing information.
     """
     def decorator(func: F) -> F:
+        func_name = endpoint_name or func.__name__
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Get a fresh logger for each request
-            logger = get_request_logger()
-            func_name = endpoint_name or func.__name__
-            start_time = time.time()
-            request_id = f"req_started_at_{datetime.datetime.now(datetime.UTC).isoformat()}"
+            logger = _LOGGER
+            start_ns = time.perf_counter_ns()
+            request_id = f"req_{time.monotonic_ns()}"
+            token = _REQ_ID.set(request_id)
             
             # Log the start of the request
-            logger.info(f"[{request_id}] Starting {func_name}")
+            # Messages use %-style args, so they are only formatted when the level is enabled
+            logger.info("[%s] Starting %s", request_id, func_name)
             
             try:
                 # Log the start of the function execution with debug info
-                logger.debug(f"[{request_id}] Executing {func_name} with args: {args}")
+                logger.debug("[%s] Executing %s with args: %s", request_id, func_name, args)
                 
                 # Call the original function
                 result = await func(*args, **kwargs)
                 
                 # Calculate and log the execution time
-                total_time = time.time() - start_time
-                logger.info(f"[{request_id}] {func_name} completed in {total_time:.2f}s")
+                total_time = (time.perf_counter_ns() - start_ns) / 1e9
+                logger.info("[%s] %s completed in %.2fs", request_id, func_name, total_time)
                 
                 return result
                 
             except HTTPException as e:
                 # Log HTTP exceptions with timing info
-                error_time = time.time() - start_time
+                error_time = (time.perf_counter_ns() - start_ns) / 1e9
                 logger.error(
-                    f"[{request_id}] HTTP error in {func_name} after {error_time:.2f}s: {str(e)}",
+                    "[%s] HTTP error in %s after %.2fs: %s", request_id, func_name, error_time, e,
                     exc_info=logger.isEnabledFor(logging.DEBUG)
                 )
                 raise
                 
             except Exception as e:
                 # Log any other exceptions with full traceback if debug is enabled
-                error_time = time.time() - start_time
+                error_time = (time.perf_counter_ns() - start_ns) / 1e9
                 logger.error(
-                    f"[{request_id}] Error in {func_name} after {error_time:.2f}s: {str(e)}",
+                    "[%s] Error in %s after %.2fs: %s", request_id, func_name, error_time, e,
                     exc_info=logger.isEnabledFor(logging.DEBUG)
                 )
                 raise
+
+            finally:
+                _REQ_ID.reset(token)
                 
         return cast(F, wrapper)
     return decorator
\ No newline at end of file
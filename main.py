@@ -1,14 +1,34 @@
-from fastapi import FastAPI
-from crews_manager import create_mermaid_graph, edit_mermaid_graph, generate_data, generate_data_for_usecase, expand_data_for_usecase
-from fastapi.responses import Response
-from fastapi import Query
-from typing import List, Optional
 from dotenv import load_dotenv
-from logging_util import time_logging, get_request_logger
-import base64
+import os
 
+# Load .env before crews_manager snapshots the environment for the MCP servers
 load_dotenv()
 
+from fastapi import FastAPI
+from crew_cache import CACHE_TTL
+from crews_manager import create_mermaid_graph, MERMAID_CACHE_TTL, edit_mermaid_graph, generate_data, generate_data_for_usecase_async, batch_generate, expand_data_for_usecase, run_crew_in_executor, crew_stats, warm_mcp_servers, close_mcp_servers, close_neo4j_driver
+from contextlib import asynccontextmanager
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import Headers
+from fastapi import Query, Body, HTTPException, Request
+from typing import Callable
+from crew_cancel import CrewCancelled, cancel_scope
+from logging_util import time_logging, get_request_logger, get_request_id, request_id_context
+import functools
+import binascii
+import hashlib
+import threading
+import string
+import zlib
+import asyncio
+import json
+
+# pybase64 is a drop-in, SIMD accelerated base64 - used when installed
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 logger = get_request_logger()
 
 tags_metadata = [
@@ -18,7 +38,213 @@ tags_metadata = [
     },
 ]
 
-app = FastAPI(openapi_tags=tags_metadata)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay the uvx install and server handshake before the first request instead of during it
+    await asyncio.to_thread(warm_mcp_servers)
+    yield
+    await asyncio.to_thread(close_mcp_servers)
+    await asyncio.to_thread(close_neo4j_driver)
+
+# DISABLE_OPENAPI=1 skips the schema (and /docs) entirely, ENABLE_OPENAPI_EXAMPLES=1 adds the request examples to it
+app = FastAPI(openapi_tags=tags_metadata, lifespan=lifespan, openapi_url=None if os.getenv("DISABLE_OPENAPI") == "1" else "/openapi.json")
+
+OPENAPI_EXAMPLES = os.getenv("ENABLE_OPENAPI_EXAMPLES") == "1"
+
+# Base64 of the example graph in the mermaid_graph_base64 descriptions
+MERMAID_EXAMPLE_B64 = "Z3JhcGggVEQKICAgICUlIE5vZGVzCiAgICBDb21wYW55WyJDb21wYW55PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5JbmR1c3RyeTogU1RSSU5HIl0gCiAgICBEZXBhcnRtZW50WyJEZXBhcnRtZW50PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5EZXNjcmlwdGlvbjogU1RSSU5HIl0gCiAgICBNYW5hZ2VyWyJNYW5hZ2VyPGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HIl0KICAgIEVtcGxveWVlWyJFbXBsb3llZTxici8+SWQ6IElOVEVHRVIgfCBLRVk8YnIvPk5hbWU6IFNUUklORzxici8+RXhwZXJpZW5jZTogU1RSSU5HPGJyLz5Db250YWN0SW5mbzogVEVYVCJdIAoKICAgICUlIFJlbGF0aW9uc2hpcHMKICAgIENvbXBhbnkgLS0+fEhBU19ERVBBUlRNRU5UIC0gZGVwYXJ0bWVudERldGFpbHMgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58V09SS1NfSU4gLSBqb2JUaXRsZSBTVFJJTkd8IERlcGFydG1lbnQKICAgIE1hbmFnZXIgLS0+fExFQURTIC0gdGVhbUdvYWwgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58RU1QTE9ZRURfQlkgLSBjb21wYW55SW5kdXN0cnkgU1RSSU5HfCBDb21wYW55CiAgICBFbXBsb3llZSAtLT58TUFOQUdFRF9CWSAtIG1hbmFnZXJOYW1lIFNUUklOR3wgTWFuYWdlcg=="
+
+def _example(value) -> dict:
+    """`example` keyword for Query/Body, left out unless OPENAPI_EXAMPLES is set"""
+    return {"example": value} if OPENAPI_EXAMPLES else {}
+
+# Most usecases accepted by one batch request, each one runs a full crew
+MAX_BATCH_USECASES = int(os.getenv("MAX_BATCH_USECASES", 10))
+
+# Largest mermaid graph accepted, base64 or plain text, so one request can't claim unbounded memory
+MAX_MERMAID_BYTES = int(os.getenv("MAX_MERMAID_BYTES", 256 * 1024))
+
+_B64_ALPHABET = (string.ascii_letters + string.digits + "+/").encode("ascii")
+
+def _check_mermaid_base64(mermaid_graph_base64: str):
+    """Cheap shape checks, so malformed or oversized input is rejected before any crew is started"""
+    raw = mermaid_graph_base64.encode("ascii", errors="replace")
+    if len(raw) > MAX_MERMAID_BYTES * 4 // 3 + 4:
+        raise HTTPException(status_code=413, detail=f"mermaid_graph_base64 is larger than {MAX_MERMAID_BYTES} bytes decoded")
+    if len(raw) % 4 or raw.rstrip(b"=").translate(None, _B64_ALPHABET):
+        raise HTTPException(status_code=400, detail="mermaid_graph_base64 is not valid base64 encoded UTF-8")
+
+@functools.lru_cache(maxsize=128)
+def _decode_mermaid(mermaid_graph_base64: str) -> str:
+    """Decode a base64 mermaid graph that passed _check_mermaid_base64"""
+    try:
+        return base64.b64decode(mermaid_graph_base64, validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="mermaid_graph_base64 is not valid base64 encoded UTF-8")
+
+# OpenAPI entry for endpoints that take the mermaid graph as a plain text request body
+MERMAID_BODY_OPENAPI = {
+    "requestBody": {
+        "required": False,
+        "description": "The mermaid graph configuration as plain text, optionally sent with Content-Encoding: gzip",
+        "content": {"text/plain": {"schema": {"type": "string"}}},
+    }
+}
+
+async def _read_mermaid(request: Request, mermaid_graph_base64: str | None) -> Callable[[], str]:
+    """
+    Loader for the mermaid graph from the legacy base64 query parameter, or else from the
+    (optionally gzipped) request body. Base64 is only checked here; the loader decodes it,
+    and is called on the crew's thread so the decode stays off the event loop.
+    """
+    if mermaid_graph_base64:
+        _check_mermaid_base64(mermaid_graph_base64)
+        return functools.partial(_decode_mermaid, mermaid_graph_base64)
+
+    too_large = f"The mermaid graph is larger than {MAX_MERMAID_BYTES} bytes"
+    if int(request.headers.get("content-length") or 0) > MAX_MERMAID_BYTES:
+        raise HTTPException(status_code=413, detail=too_large)
+    # Read chunk by chunk, so a chunked body or one with a wrong Content-Length is cut off at the limit
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_MERMAID_BYTES:
+            raise HTTPException(status_code=413, detail=too_large)
+        chunks.append(chunk)
+    body = b"".join(chunks)
+    try:
+        if request.headers.get("content-encoding", "").lower() == "gzip":
+            # Bounded, so a small gzip bomb can't inflate past the limit
+            body = zlib.decompressobj(wbits=31).decompress(body, MAX_MERMAID_BYTES + 1)
+        mermaid_graph = body.decode("utf-8")
+    except (zlib.error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Request body is not valid (gzipped) UTF-8 text")
+    if len(body) > MAX_MERMAID_BYTES:
+        raise HTTPException(status_code=413, detail=too_large)
+    if not mermaid_graph.strip():
+        raise HTTPException(status_code=400, detail="Send the mermaid graph as the request body or as mermaid_graph_base64")
+    return lambda: mermaid_graph
+
+# Crew thread entry points for endpoints taking a mermaid graph: decoding it and running
+# the crew share one hop off the event loop
+def _handle_edit(instructions: str, load_mermaid: Callable[[], str], step_listener=None):
+    return edit_mermaid_graph(instructions, load_mermaid(), step_listener)
+
+def _handle_generate_data(load_mermaid: Callable[[], str], step_listener=None):
+    return generate_data(load_mermaid(), step_listener)
+
+@functools.lru_cache(maxsize=128)
+def _encode_text(raw: str) -> bytes:
+    """UTF-8 body for a memoized crew output. Cache hits hand back the same str, so repeats skip the encode"""
+    return raw.encode("utf-8")
+
+# Built once, so responses skip media_type's charset handling
+_TEXT_HEADERS = Headers({"content-type": "text/plain; charset=utf-8"})
+
+def _text_response(body: bytes, headers: dict | None = None) -> Response:
+    """Plain text response for an already encoded body, which Starlette sends as is"""
+    if headers:
+        return Response(content=body, headers={**_TEXT_HEADERS, **headers})
+    return Response(content=body, headers=_TEXT_HEADERS)
+
+# Repeat requests get the same graph back, from memory and then from the disk cache
+_MERMAID_CACHE_CONTROL = f"public, max-age={int(min(MERMAID_CACHE_TTL, CACHE_TTL))}"
+
+def _mermaid_cache_headers(body: bytes) -> dict:
+    """ETag of the graph being sent and its Cache-Control, none when the crew caches are disabled"""
+    if os.getenv("CREW_CACHE_DISABLED") == "1":
+        return {}
+    return {
+        "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        "cache-control": _MERMAID_CACHE_CONTROL,
+    }
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    return etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(","))
+
+STREAM_QUERY = Query(True, description="Stream agent steps as Server-Sent Events, false waits for the final result")
+MERMAID_STREAM_QUERY = Query(False, description="Stream agent steps as Server-Sent Events instead of returning the plain text graph")
+
+# Endpoint parameters, built once at import
+USECASE_QUERY = Query(..., description="The usecase prompt (ie healthcare, ecommerce, an employee org chart)", **_example("Employee Org"))
+EXPAND_USECASE_QUERY = Query(..., description="The usecase prompt (ie healthcare, ecommerce, an employee org chart)", **_example("Customer Support"))
+USECASES_BODY = Body(..., description="The usecase prompts, each generated into the same database", **_example(["Employee Org", "Customer Support"]))
+ENTITIES_QUERY = Query(None, description="Optional List of Nodes to include", **_example(["Employee", "Company"]))
+RELATIONSHIPS_QUERY = Query(None, description="Optional List of Relationship types to include", **_example(["SUPERVISES", "EMPLOYED_AT"]))
+INSTRUCTIONS_QUERY = Query(..., description="The instructions for editing the mermaid graph configuration", **_example("Add an 'Address' node and any appropriate relationships for it"))
+MERMAID_BASE64_QUERY = Query(None, description="""
+Base64 encoded string of the mermaid graph configuration.
+Prefer sending the graph as a plain text request body instead.
+
+Encoded example:
+
+    graph TD
+    %% Nodes
+    Company["Company<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Industry: STRING"]
+    Department["Department<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Description: STRING"]
+    Manager["Manager<br/>Id: INTEGER | KEY<br/>Name: STRING"]
+    Employee["Employee<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Experience: STRING<br/>ContactInfo: TEXT"]
+
+    %% Relationships
+    Company -->|HAS_DEPARTMENT - departmentDetails STRING| Department
+    Employee -->|WORKS_IN - jobTitle STRING| Department
+    Manager -->|LEADS - teamGoal STRING| Department
+    Employee -->|EMPLOYED_BY - companyIndustry STRING| Company
+    Employee -->|MANAGED_BY - managerName STRING| Manager
+""", **_example(MERMAID_EXAMPLE_B64))
+
+def _step_event(output) -> dict:
+    """Short, JSON safe summary of a CrewAI agent step"""
+    return {
+        "type": type(output).__name__,
+        "tool": getattr(output, "tool", None),
+        "result": str(getattr(output, "result", getattr(output, "output", "")))[:500],
+    }
+
+async def _event_stream(run, request_id: str):
+    """
+    Server-Sent Events for a crew run: one event per agent step, then a final
+    {"done": true, "result": ...} event. `run(step_listener)` starts the crew.
+    A client disconnect stops the run before its next tool call or agent step: StreamingResponse
+    stops this generator on http.disconnect, and the finally block flags the run as closed.
+    Crews built in the cancel_scope check the flag in every tool (see crew_cancel), and the
+    step listener raises on it from the crew's thread. An LLM call already in flight still finishes.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    closed = threading.Event()
+
+    # Steps are reported from the crew's worker threads
+    def step_listener(output):
+        if closed.is_set():
+            raise CrewCancelled("Event stream closed by the client")
+        # CrewAI reports a tool step twice, as its ToolResult and then as the AgentAction carrying
+        # the same result, so only the AgentAction becomes an event
+        if type(output).__name__ == "ToolResult":
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, {"step": _step_event(output)})
+
+    # The endpoint, and time_logging's request id with it, has returned by the time the
+    # response streams, so the crew task is started under the id captured by _stream_response.
+    # The task's copied context also carries the cancel flag to the crews it builds
+    with request_id_context(request_id), cancel_scope(closed):
+        crew_run = asyncio.ensure_future(run(step_listener))
+    crew_run.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+        try:
+            result = crew_run.result()
+            yield f"data: {json.dumps({'done': True, 'result': getattr(result, 'raw', result)}, default=str)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'done': True, 'error': str(e)})}\n\n"
+    finally:
+        closed.set()
+        crew_run.cancel()
+
+def _stream_response(run) -> StreamingResponse:
+    return StreamingResponse(_event_stream(run, get_request_id()), media_type="text/event-stream")
 
 # Root endpoint for server status
 @app.get("/")
@@ -26,109 +252,86 @@ async def root():
     """Status endpoint"""
     return {"message": "CrewAI+BAML+Neo4j Synthetic Data Generator Server running"}
 
+@app.get("/metrics")
+async def metrics():
+    """Crews in progress and queued for one of the MCP_MAX_INFLIGHT slots"""
+    return crew_stats()
+
 
 @app.get("/mcp_only/generate_mermaid_graph", tags=["MCP Only"])
 @time_logging("generate_mermaid_graph_mcp_only_endpoint")
 async def generate_mermaid_graph_mcp_only_endpoint(
-    usecase: str = Query(..., 
-        description="The usecase prompt (ie healthcare, ecommerce, an employee org)", 
-        example="Employee Org"
-    ),
-    entities: Optional[List[str]] = Query(None,
-        description="Optional List of Nodes to include",
-        example=["Employee", "Company"]),
-    relationships: Optional[list[str]] = Query(None,
-        description="Optional List of Relationship types to include",
-        example=["SUPERVISES", "EMPLOYED_AT"])
+    request: Request,
+    usecase: str = USECASE_QUERY,
+    entities: list[str] | None = ENTITIES_QUERY,
+    relationships: list[str] | None = RELATIONSHIPS_QUERY,
+    stream: bool = MERMAID_STREAM_QUERY,
     ):
     """Generate a mermaid chart config file for a given usecase using CrewAI + Neo4j MCP Servers"""
 
-    result = create_mermaid_graph(usecase, entities, relationships)
+    if stream:
+        return _stream_response(lambda step_listener: run_crew_in_executor(create_mermaid_graph, usecase, entities, relationships, step_listener))
+
+    result = await run_crew_in_executor(create_mermaid_graph, usecase, entities, relationships)
     
-    logger.info(f'generate_mermaid_graph_mcp_only_endpoint output: {result}')
+    logger.info('generate_mermaid_graph_mcp_only_endpoint output: %.512s', result)
+
+    # A client revalidating the graph it already has gets a 304 instead of the body
+    body = _encode_text(result.raw)
+    cache_headers = _mermaid_cache_headers(body)
+    if cache_headers and _etag_matches(request, cache_headers["etag"]):
+        return Response(status_code=304, headers=cache_headers)
 
     # Return the raw output from CrewAI result
-    return Response(content=result.raw, media_type="text/plain")
+    return _text_response(body, cache_headers)
 
-@app.patch("/mcp_only/edit_mermaid_graph", tags=["MCP Only"])
+@app.patch("/mcp_only/edit_mermaid_graph", tags=["MCP Only"], openapi_extra=MERMAID_BODY_OPENAPI)
 @time_logging("edit_mermaid_graph_mcp_only_endpoint")
 async def edit_mermaid_graph_mcp_only_endpoint(
-        instructions: str = Query(..., description="The instructions for editing the mermaid graph configuration", example="Add an 'Address' node and any appropriate relationships for it"), 
-        mermaid_graph_base64: str = Query(..., description="""
-        Base64 encoded string of the mermaid graph configuration.
-        
-        Encoded example:
-
-        graph TD
-        %% Nodes
-        Company["Company<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Industry: STRING"] 
-        Department["Department<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Description: STRING"] 
-        Manager["Manager<br/>Id: INTEGER | KEY<br/>Name: STRING"]
-        Employee["Employee<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Experience: STRING<br/>ContactInfo: TEXT"] 
-
-        %% Relationships
-        Company -->|HAS_DEPARTMENT - departmentDetails STRING| Department
-        Employee -->|WORKS_IN - jobTitle STRING| Department
-        Manager -->|LEADS - teamGoal STRING| Department
-        Employee -->|EMPLOYED_BY - companyIndustry STRING| Company
-        Employee -->|MANAGED_BY - managerName STRING| Manager
-        
-        """, 
-        example="Z3JhcGggVEQKICAgICUlIE5vZGVzCiAgICBDb21wYW55WyJDb21wYW55PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5JbmR1c3RyeTogU1RSSU5HIl0gCiAgICBEZXBhcnRtZW50WyJEZXBhcnRtZW50PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5EZXNjcmlwdGlvbjogU1RSSU5HIl0gCiAgICBNYW5hZ2VyWyJNYW5hZ2VyPGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HIl0KICAgIEVtcGxveWVlWyJFbXBsb3llZTxici8+SWQ6IElOVEVHRVIgfCBLRVk8YnIvPk5hbWU6IFNUUklORzxici8+RXhwZXJpZW5jZTogU1RSSU5HPGJyLz5Db250YWN0SW5mbzogVEVYVCJdIAoKICAgICUlIFJlbGF0aW9uc2hpcHMKICAgIENvbXBhbnkgLS0+fEhBU19ERVBBUlRNRU5UIC0gZGVwYXJ0bWVudERldGFpbHMgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58V09SS1NfSU4gLSBqb2JUaXRsZSBTVFJJTkd8IERlcGFydG1lbnQKICAgIE1hbmFnZXIgLS0+fExFQURTIC0gdGVhbUdvYWwgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58RU1QTE9ZRURfQlkgLSBjb21wYW55SW5kdXN0cnkgU1RSSU5HfCBDb21wYW55CiAgICBFbXBsb3llZSAtLT58TUFOQUdFRF9CWSAtIG1hbmFnZXJOYW1lIFNUUklOR3wgTWFuYWdlcg==")
+        request: Request,
+        instructions: str = INSTRUCTIONS_QUERY,
+        mermaid_graph_base64: str | None = MERMAID_BASE64_QUERY,
+        stream: bool = MERMAID_STREAM_QUERY,
     ):
     """Edit a mermaid chart config file using CrewAI +Neo4j MCP Servers"""
 
-    mermaid_graph = base64.b64decode(mermaid_graph_base64.encode()).decode('utf-8')
+    load_mermaid = await _read_mermaid(request, mermaid_graph_base64)
 
-    result = edit_mermaid_graph(instructions, mermaid_graph)
+    if stream:
+        return _stream_response(lambda step_listener: run_crew_in_executor(_handle_edit, instructions, load_mermaid, step_listener))
+
+    result = await run_crew_in_executor(_handle_edit, instructions, load_mermaid)
     
-    logger.info(f'edit_mermaid_graph_mcp_only_endpoint output: {result}')
+    logger.info('edit_mermaid_graph_mcp_only_endpoint output: %.512s', result)
     
-    return Response(content=result.raw, media_type="text/plain")
+    # Edits are never memoized, so there is no earlier encode to reuse
+    return _text_response(result.raw.encode("utf-8"))
 
-@app.post("/mcp_only/generate_data", tags=["MCP Only"])
+@app.post("/mcp_only/generate_data", tags=["MCP Only"], openapi_extra=MERMAID_BODY_OPENAPI)
 @time_logging("generate_data_endpoint_mcp_only_endpoint")
 async def generate_data_endpoint_mcp_only_endpoint(
-    mermaid_graph_base64: str = Query(..., 
-    description="""
-    Base64 encoded string of the mermaid graph configuration
-
-    Encoded Example:
-
-    graph TD
-    %% Nodes
-    Company["Company<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Industry: STRING"] 
-    Department["Department<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Description: STRING"] 
-    Manager["Manager<br/>Id: INTEGER | KEY<br/>Name: STRING"]
-    Employee["Employee<br/>Id: INTEGER | KEY<br/>Name: STRING<br/>Experience: STRING<br/>ContactInfo: TEXT"] 
-
-    %% Relationships
-    Company -->|HAS_DEPARTMENT - departmentDetails STRING| Department
-    Employee -->|WORKS_IN - jobTitle STRING| Department
-    Manager -->|LEADS - teamGoal STRING| Department
-    Employee -->|EMPLOYED_BY - companyIndustry STRING| Company
-    Employee -->|MANAGED_BY - managerName STRING| Manager
-    """,
-    example="Z3JhcGggVEQKICAgICUlIE5vZGVzCiAgICBDb21wYW55WyJDb21wYW55PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5JbmR1c3RyeTogU1RSSU5HIl0gCiAgICBEZXBhcnRtZW50WyJEZXBhcnRtZW50PGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HPGJyLz5EZXNjcmlwdGlvbjogU1RSSU5HIl0gCiAgICBNYW5hZ2VyWyJNYW5hZ2VyPGJyLz5JZDogSU5URUdFUiB8IEtFWTxici8+TmFtZTogU1RSSU5HIl0KICAgIEVtcGxveWVlWyJFbXBsb3llZTxici8+SWQ6IElOVEVHRVIgfCBLRVk8YnIvPk5hbWU6IFNUUklORzxici8+RXhwZXJpZW5jZTogU1RSSU5HPGJyLz5Db250YWN0SW5mbzogVEVYVCJdIAoKICAgICUlIFJlbGF0aW9uc2hpcHMKICAgIENvbXBhbnkgLS0+fEhBU19ERVBBUlRNRU5UIC0gZGVwYXJ0bWVudERldGFpbHMgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58V09SS1NfSU4gLSBqb2JUaXRsZSBTVFJJTkd8IERlcGFydG1lbnQKICAgIE1hbmFnZXIgLS0+fExFQURTIC0gdGVhbUdvYWwgU1RSSU5HfCBEZXBhcnRtZW50CiAgICBFbXBsb3llZSAtLT58RU1QTE9ZRURfQlkgLSBjb21wYW55SW5kdXN0cnkgU1RSSU5HfCBDb21wYW55CiAgICBFbXBsb3llZSAtLT58TUFOQUdFRF9CWSAtIG1hbmFnZXJOYW1lIFNUUklOR3wgTWFuYWdlcg=="),
+    request: Request,
+    mermaid_graph_base64: str | None = MERMAID_BASE64_QUERY,
+    stream: bool = STREAM_QUERY,
 ):
     """
     Generate and upload synthetic graph dataset to Neo4j from a Mermaid Graph TB configuration.
     
-    This endpoint takes a base64 encoded mermaid graph configuration to generate data.
+    This endpoint takes the mermaid graph configuration as a plain text body, or base64 encoded in the query string.
     """
 
-    mermaid_graph = base64.b64decode(mermaid_graph_base64.encode()).decode('utf-8')
+    load_mermaid = await _read_mermaid(request, mermaid_graph_base64)
 
-    output = generate_data(mermaid_graph)
+    if stream:
+        return _stream_response(lambda step_listener: run_crew_in_executor(_handle_generate_data, load_mermaid, step_listener))
+
+    output = await run_crew_in_executor(_handle_generate_data, load_mermaid)
     
     return output
 
 @app.post("/mcp_only/generate_data_for_usecase", tags=["MCP Only"])
 @time_logging("generate_data_for_usecase_endpoint_mcp_only_endpoint")
-async def generate_data_mcp_only_endpoint(usecase: str = Query(..., 
-    description="The usecase prompt (ie healthcare, ecommerce, an employee org chart)",
-    example="Employee Org"
-)):
+async def generate_data_mcp_only_endpoint(usecase: str = USECASE_QUERY, stream: bool = STREAM_QUERY):
     """
     Generate and upload a synthetic graph dataset to Neo4j from a usecase prompt.
     This endpoint uses:
@@ -136,16 +339,31 @@ async def generate_data_mcp_only_endpoint(usecase: str = Query(...,
         - Neo4j's Cypher MCP server for uploading the data.
         - CrewAI for orchestrating the process.
     """    
-    output = generate_data_for_usecase(usecase)
+    if stream:
+        return _stream_response(lambda step_listener: generate_data_for_usecase_async(usecase, step_listener=step_listener))
+
+    output = await generate_data_for_usecase_async(usecase)
     
     return output
 
+@app.post("/mcp_only/generate_data_for_usecases", tags=["MCP Only"])
+@time_logging("generate_data_for_usecases_endpoint_mcp_only_endpoint")
+async def generate_data_for_usecases_mcp_only_endpoint(usecases: list[str] = USECASES_BODY):
+    """
+    Generate and upload a synthetic graph dataset to Neo4j for each of several usecase prompts.
+    Up to MAX_PARALLEL_CREWS crews run at once, and orphan nodes are trimmed once all of them are done.
+    Returns a result or an error for each usecase, in order.
+    """
+    if len(usecases) > MAX_BATCH_USECASES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_USECASES} usecases can be generated in one request")
+
+    output = await batch_generate(usecases)
+
+    return output
+
 @app.post("/mcp_only/expand_data_for_usecase", tags=["MCP Only"])
 @time_logging("expand_data_for_usecase_endpoint_mcp_only_endpoint")
-async def expand_data_mcp_only_endpoint(usecase: str = Query(..., 
-    description="The usecase prompt (ie healthcare, ecommerce, an employee org chart)",
-    example="Customer Support"
-)):
+async def expand_data_mcp_only_endpoint(usecase: str = EXPAND_USECASE_QUERY, stream: bool = STREAM_QUERY):
     """
     Generate and upload additioanl synthetic graph dataset to Neo4j from a usecase prompt.
     This endpoint uses:
@@ -153,6 +371,9 @@ async def expand_data_mcp_only_endpoint(usecase: str = Query(...,
         - Neo4j's Cypher MCP server for uploading the data.
         - CrewAI for orchestrating the process.
     """    
-    output = expand_data_for_usecase(usecase)
+    if stream:
+        return _stream_response(lambda step_listener: run_crew_in_executor(expand_data_for_usecase, usecase, step_listener))
+
+    output = await run_crew_in_executor(expand_data_for_usecase, usecase)
     
     return output
\ No newline at end of file
@@ -0,0 +1,74 @@
+from typing import Any, Tuple
+import re
+
+# Node definitions, ie Employee["Employee<br/>id: INTEGER | KEY<br/>name: STRING"]
+_NODE_RE = re.compile(r'^\s*(\w+)\["([^"]*)"\]')
+# Relationships, ie Employee -->|WORKS_IN - jobTitle STRING| Department
+_EDGE_RE = re.compile(r'^\s*(\w+)\s*-->\|\s*(\w+)([^|]*)\|\s*(\w+)')
+_EDGE_PROPS_PREFIX_RE = re.compile(r"^\s*(?:-|<br/>)\s*")
+_PROPERTY_RE = re.compile(r"^\s*(\w+)\s*:\s*([^|]*?)\s*(\|\s*KEY\s*)?$")
+
+# Relationship type used for the edges connect_mermaid adds
+BRIDGE_TYPE = "RELATED_TO"
+
+def parse_mermaid(src: str) -> dict:
+    """
+    Parse a mermaid graph TD data model into
+    {"nodes": {label: {"key": key property or None, "props": {name: type}}},
+     "edges": [(from label, relationship type, to label, property text)]}
+    """
+    nodes = {}
+    edges = []
+    for line in src.splitlines():
+        if match := _EDGE_RE.match(line):
+            source, rel_type, props, target = match.groups()
+            edges.append((source, rel_type, target, _EDGE_PROPS_PREFIX_RE.sub("", props).strip()))
+        elif match := _NODE_RE.match(line):
+            label, body = match.groups()
+            node = nodes.setdefault(label, {"key": None, "props": {}})
+            for part in body.split("<br/>")[1:]:
+                if prop := _PROPERTY_RE.match(part):
+                    name, prop_type, key = prop.groups()
+                    node["props"][name] = prop_type
+                    if key and node["key"] is None:
+                        node["key"] = name
+    return {"nodes": nodes, "edges": edges}
+
+def components(model: dict) -> list[list[str]]:
+    """Connected components of a parsed model, ignoring relationship direction, in definition order"""
+    parent = {}
+
+    def find(label):
+        parent.setdefault(label, label)
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    for label in model["nodes"]:
+        find(label)
+    for source, _, target, _ in model["edges"]:
+        parent[find(source)] = find(target)
+
+    groups = {}
+    for label in parent:
+        groups.setdefault(find(label), []).append(label)
+    return list(groups.values())
+
+def connect_mermaid(src: str) -> str:
+    """
+    Return the mermaid graph with a BRIDGE_TYPE relationship from every disconnected
+    group of nodes to the first one, so the data model is a single connected graph.
+    Already connected graphs are returned unchanged.
+    """
+    groups = components(parse_mermaid(src))
+    if len(groups) <= 1:
+        return src
+
+    anchor = groups[0][0]
+    bridges = [f"    {group[0]} -->|{BRIDGE_TYPE}| {anchor}" for group in groups[1:]]
+    return "\n".join([src.rstrip(), "", "    %% Relationships added to connect the graph", *bridges]) + "\n"
+
+def connected_mermaid_guardrail(output) -> Tuple[bool, Any]:
+    """Task guardrail for data modelling tasks, hands later tasks the model with connect_mermaid's bridges added"""
+    return (True, connect_mermaid(output.raw))
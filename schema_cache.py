@@ -0,0 +1,67 @@
+from crewai.agents.parser import AgentAction
+from crewai.tools import tool
+from pathlib import Path
+import hashlib
+import json
+import os
+
+CACHE_DIR = Path(os.getenv("MCP_CACHE_DIR", ".mcp_cache"))
+
+# Tools whose (potentially very large) results are swapped for a reference
+SCHEMA_TOOLS = ("get_neo4j_schema", "read_neo4j_cypher")
+
+# Results shorter than this are cheaper to keep inline than to fetch again
+MIN_STASH_CHARS = 1000
+
+def _summarize(payload: str) -> dict:
+    """Pull the label and relationship type names out of a get_neo4j_schema result"""
+    try:
+        schema = json.loads(payload)
+    except ValueError:
+        return {}
+
+    # apoc.meta.schema() results may come wrapped as [{"value": {...}}]
+    if isinstance(schema, list) and len(schema) == 1 and isinstance(schema[0], dict):
+        schema = schema[0].get("value", schema[0])
+    if not isinstance(schema, dict):
+        return {}
+
+    entries = [(name, info) for name, info in schema.items() if isinstance(info, dict)]
+    return {
+        "labels": [name for name, info in entries if info.get("type") == "node"],
+        "relationship_types": [name for name, info in entries if info.get("type") == "relationship"],
+    }
+
+def stash_schema_step(step) -> None:
+    """
+    Agent step_callback that writes large schema tool results to ./.mcp_cache/<sha>.json
+    and replaces the observation the agent keeps in its prompt with a short
+    {"schema_ref": ..., "labels": [...], "relationship_types": [...]} summary.
+    The full payload stays available through the fetch_schema tool.
+    """
+    if not isinstance(step, AgentAction) or step.tool.strip() not in SCHEMA_TOOLS:
+        return
+    result = getattr(step, "result", None)
+    if not isinstance(result, str) or len(result) < MIN_STASH_CHARS:
+        return
+
+    ref = hashlib.sha256(result.encode()).hexdigest()[:16]
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{ref}.json").write_text(result, encoding="utf-8")
+
+    summary = json.dumps({"schema_ref": ref, **_summarize(result)})
+    # The executor appends step.text to the agent's messages after this callback runs
+    step.text = step.text.replace(result, summary)
+    step.result = summary
+
+@tool("fetch_schema")
+def fetch_schema(schema_ref: str) -> str:
+    """
+    Return the full Neo4j schema or query result stored under a schema_ref.
+    Only use this when the label and relationship type lists are not enough.
+    """
+    path = CACHE_DIR / f"{Path(schema_ref).name}.json"
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return f"No cached schema found for schema_ref {schema_ref}"